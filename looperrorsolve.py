@@ -3,26 +3,37 @@ from frappe import exceptions as frappe_exceptions
 from frappe.utils import get_site_path
 from frappe.utils.file_manager import save_file
 from openpyxl import load_workbook, Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from io import BytesIO
 import datetime
 import re
-import json
+import orjson
 import csv
 import io
 import base64
 import tempfile
-import os
+import shutil
 import traceback
 import time
+import hashlib
+import functools
+import difflib
+from dataclasses import dataclass
+from typing import NamedTuple
 
 # ================= CONSTANTS & STYLES =================
 
 MAX_FILE_SIZE_MB = 20
+UPLOAD_SPOOL_SIZE = 4 * 1024 * 1024  # Uploads larger than this are spooled to disk
 VALIDATION_TIMEOUT = 120
 SHEET_TIMEOUT = 60
 LINK_CACHE_LIMIT = 5000  # Adjust this if needed
+LINK_QUERY_CHUNK = 1000  # Max names per "name IN (...)" query
+FUZZY_SUGGESTION_NAMES = 200  # Fuzzy link suggestions only for DocTypes with at most this many names
+FUZZY_SUGGESTION_MISSES = 200  # ...and only for this many distinct invalid values per cache fill
+VERBOSE_LOGGING = False  # Print progress and timing details to stdout
 
 ERROR_FILL = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
 ERROR_TEXT_COLOR = Font(color="9C0006")
@@ -67,7 +78,51 @@ ERROR_CODE_LABELS = {
     "TIMEOUT_ERROR": "Processing Timeout",
 }
 
+# Columns that can be empty (system fields, notes, descriptions)
+OPTIONAL_COLUMNS = frozenset(("id", "institute", "notes", "description", "brief", "details", "remarks", "comments"))
+
+# Cell types always valid for a (non-year) fieldtype, matching validate_value
+VALID_CELL_TYPES = {
+    "Int": frozenset((int, bool)),
+    "Check": frozenset((int, bool)),
+    "Float": frozenset((int, float, bool)),
+    "Currency": frozenset((int, float, bool)),
+    "Percent": frozenset((int, float, bool)),
+    "Date": frozenset((datetime.date, datetime.datetime)),
+    "Datetime": frozenset((datetime.datetime,)),
+}
+
+# Year columns accept MIN_YEAR..next year; plain numbers can be range-checked directly
+MIN_YEAR = 1900
+YEAR_NUMBER_TYPES = frozenset((int, float))
+
+# Trailing "(...)" hint stripped from headers, e.g. "Year (YYYY)"
+HEADER_HINT_RE = re.compile(r"\s*\(.*\)$")
+# Header words used to guess a fieldtype when the DocType has no fields
+HEADER_WORD_RE = re.compile(r"\w+")
+CURRENCY_HEADER_WORDS = frozenset(("financial", "budget", "amount", "cost", "price", "rate"))
+NUMERIC_HEADER_WORDS = frozenset((
+    "count", "total", "value", "qty", "quantity", "ranking", "index", "strength", "position", "vacant", "ratio",
+    "currency",
+))
+YEAR_STR_RE = re.compile(r"\d{4}")
+# Plain decimal text float() always accepts, so the common case skips try/float();
+# anything else (exponents, nan, underscores, 16+ digit ints) still goes through float()
+FLOAT_STR_RE = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+INT_STR_RE = re.compile(r"[+-]?\d{1,15}(?:\.0*)?")
+
+# Values treated as blank by the required, key and duplicate checks
+BLANK_VALUES = frozenset(("", "NA", "N/A"))
+# Stripped cell text that makes a cell count as empty (empty-row and datatype checks)
+EMPTY_CELL_VALUES = frozenset(("", "NA", "N/A", "na", "n/a"))
+
+# Known codes share one label for both the readable code and the error type
+ERROR_CODE_LABEL_PAIRS = {code: (label, label) for code, label in ERROR_CODE_LABELS.items()}
+
 _link_cache = {}
+_link_cache_cf = {}  # casefolded name -> cached name, for case-insensitive lookups
+_link_suggestion_cache = {}  # doctype -> {(casefolded name, max): suggestions}
+_link_exists_cache = {}  # doctype -> {name: exists}, for DocTypes checked without a name cache
 _link_cache_sizes = {}
 
 
@@ -75,6 +130,30 @@ class ValidationTimeout(Exception):
     pass
 
 
+class CellError(NamedTuple):
+    """
+    A datatype/link error of one cell; turned into a JSON error only where it is reported
+    """
+    row: int
+    column: str
+    code: str
+    message: str
+    suggestions: list | None = None
+
+
+@dataclass(slots=True)
+class SimpleField:
+    """
+    Stand-in for a DocField, built from a header when the DocType has no fields
+    """
+    label: str = ""
+    fieldname: str = ""
+    fieldtype: str = "Data"
+    reqd: int = 0
+    unique: int = 0
+    options: str | None = None
+
+
 # ================= MAIN FUNCTION =================
 
 @frappe.whitelist(allow_guest=True)
@@ -96,9 +175,10 @@ Sheet Timeout: {SHEET_TIMEOUT}s
 Total Timeout: {VALIDATION_TIMEOUT}s
 {'='*60}
 """
-    print(log_msg)
-    frappe.log_error(log_msg, "Validation Start")
+    log(log_msg)
     
+    file_buffer = None
+    wb_input = None
     try:
         # 1. File checks
         if "file" not in frappe.request.files:
@@ -115,22 +195,24 @@ Total Timeout: {VALIDATION_TIMEOUT}s
         if size_mb > MAX_FILE_SIZE_MB:
             return fail("FILE_TOO_LARGE", f"File size exceeds {MAX_FILE_SIZE_MB} MB")
 
-        print(f"[TIMING] File validation: {time.time() - start_time:.2f}s")
+        log(f"[TIMING] File validation: {time.time() - start_time:.2f}s")
 
         # 2. Load workbook
         load_start = time.time()
         try:
-            file_content = file.read()
-            wb_input = load_workbook(BytesIO(file_content), data_only=True, read_only=False)
-            print(f"[TIMING] Workbook loaded: {time.time() - load_start:.2f}s")
+            # Copy the upload in chunks; read-only mode keeps reading from this buffer
+            file_buffer = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE, suffix=".xlsx")
+            shutil.copyfileobj(file.stream, file_buffer)
+            file_buffer.seek(0)
+            wb_input = load_workbook(file_buffer, data_only=True, read_only=True)
+            log(f"[TIMING] Workbook loaded: {time.time() - load_start:.2f}s")
         except Exception as e:
             if "encrypted" in str(e).lower() or "password" in str(e).lower():
                 return fail("PASSWORD_PROTECTED", "This file is password protected.")
             return fail("UNREADABLE_FILE", f"File is corrupted or unreadable: {str(e)}")
 
         # 3. Create output workbook
-        wb_output = Workbook()
-        wb_output.remove(wb_output.active)
+        wb_output = Workbook(write_only=True)
         
         overall_stats = {
             "total_sheets": len(wb_input.sheetnames),
@@ -141,14 +223,14 @@ Total Timeout: {VALIDATION_TIMEOUT}s
             "all_json_errors": []
         }
         
-        print(f"\n[INFO] Processing {len(wb_input.sheetnames)} sheets: {wb_input.sheetnames}")
+        log(f"\n[INFO] Processing {len(wb_input.sheetnames)} sheets: {wb_input.sheetnames}")
         
         # 4. Process each sheet
         for sheet_idx, sheet_name in enumerate(wb_input.sheetnames, 1):
             sheet_start = time.time()
-            print(f"\n{'='*60}")
-            print(f"[SHEET {sheet_idx}/{len(wb_input.sheetnames)}] {sheet_name}")
-            print(f"{'='*60}")
+            log(f"\n{'='*60}")
+            log(f"[SHEET {sheet_idx}/{len(wb_input.sheetnames)}] {sheet_name}")
+            log(f"{'='*60}")
             
             # Check timeout
             elapsed = time.time() - start_time
@@ -168,7 +250,7 @@ Total Timeout: {VALIDATION_TIMEOUT}s
                     overall_stats["all_json_errors"].extend(sheet_result["json_errors"])
                 continue
             
-            print(f"[OK] DocType '{sheet_name}' exists")
+            log(f"[OK] DocType '{sheet_name}' exists")
             
             # Process sheet
             try:
@@ -193,9 +275,9 @@ Total Timeout: {VALIDATION_TIMEOUT}s
                 overall_stats["total_rows"] += sheet_result.get("total_rows", 0)
                 
                 sheet_time = time.time() - sheet_start
-                print(f"\n[TIMING] Sheet '{sheet_name}' completed in {sheet_time:.2f}s")
-                print(f"  - Rows processed: {sheet_result.get('total_rows', 0)}")
-                print(f"  - Errors found: {sheet_result.get('error_count', 0)}")
+                log(f"\n[TIMING] Sheet '{sheet_name}' completed in {sheet_time:.2f}s")
+                log(f"  - Rows processed: {sheet_result.get('total_rows', 0)}")
+                log(f"  - Errors found: {sheet_result.get('error_count', 0)}")
                 
             except ValidationTimeout:
                 print(f"[ERROR] Sheet timeout after {SHEET_TIMEOUT}s")
@@ -210,27 +292,22 @@ Total Timeout: {VALIDATION_TIMEOUT}s
                 overall_stats["sheet_results"].append(sheet_result)
 
         # 5. Save file
-        print(f"\n{'='*60}")
-        print("SAVING OUTPUT FILE")
-        print(f"{'='*60}")
+        log(f"\n{'='*60}")
+        log("SAVING OUTPUT FILE")
+        log(f"{'='*60}")
         
         save_start = time.time()
-        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
-            wb_output.save(tmp.name)
-            tmp.seek(0)
-            content = tmp.read()
-            tmp_path = tmp.name
-
+        # Write-only sheets are already spooled, so the zip is assembled straight into memory
+        output = BytesIO()
+        wb_output.save(output)
         saved_file = save_file(
             fname=f"MultiSheet_Validated.xlsx",
-            content=content,
+            content=output.getvalue(),
             dt=None,
             dn=None,
             is_private=0
         )
-
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+        output.close()
         
         total_time = time.time() - start_time
         
@@ -245,8 +322,8 @@ Total rows: {overall_stats['total_rows']}
 Total errors: {overall_stats['total_errors']}
 {'='*60}
 """
-        print(summary)
-        frappe.log_error(summary, "Validation Complete")
+        log(summary)
+        frappe.logger().info(summary)
 
         return safe_response({
             "structure_valid": overall_stats["total_errors"] == 0,
@@ -265,6 +342,11 @@ Total errors: {overall_stats['total_errors']}
         print(error_msg)
         frappe.log_error(error_msg, "Validation Error")
         return fail("PROCESSING_ERROR", f"Unexpected error: {str(e)}")
+    finally:
+        if wb_input is not None:
+            wb_input.close()
+        if file_buffer is not None:
+            file_buffer.close()
 
 
 # ================= PROCESS SHEET =================
@@ -285,18 +367,31 @@ def process_sheet_with_validation(wb_input, wb_output, doctype, skip_links, star
                                      f"Worksheet '{doctype}' not found.")
         
         sheet_input = wb_input[sheet_map[sheet_key]]
+        # Read-only sheets trust the stored dimensions, which some writers get wrong
+        sheet_input.reset_dimensions()
         
         # Read headers
-        header_row = next(sheet_input.iter_rows(min_row=1, max_row=1, values_only=True), None)
-        if not header_row:
-            return create_error_sheet(wb_output, doctype, "NO_HEADER", "Header row missing")
+        header_row = tuple(next(sheet_input.iter_rows(min_row=1, max_row=1, values_only=True), None) or ())
+
+        # Load all rows (the link prefetch and column passes need the whole sheet).
+        # Read-only rows end at their last stored cell, so widen the header to the
+        # data: values past the last header then show up as blank header cells
+        # (and a blank sheet reads as one empty header cell, not a missing row)
+        all_rows = list(sheet_input.iter_rows(min_row=2, values_only=True))
+        # Resized/formatted rows are stored without cells and read back as (), as do
+        # the gaps before them; trailing ones aren't data (the full workbook's
+        # max_row ignored them), so drop them instead of reporting empty rows
+        while all_rows and not all_rows[-1]:
+            all_rows.pop()
+        data_width = max((filled_width(r) for r in all_rows if len(r) > len(header_row)), default=0)
+        header_row += (None,) * (max(data_width, 1) - len(header_row))
 
         headers = [str(h).strip() for h in header_row if h]
         if not headers:
             return create_error_sheet(wb_output, doctype, "EMPTY_HEADERS", 
                                      "The header row is empty or the sheet is blank.")
 
-        print(f"[INFO] Found {len(headers)} columns: {headers}")
+        log(f"[INFO] Found {len(headers)} columns: {headers}")
 
         # Validation checks
         if any(h is None or str(h).strip() == "" for h in header_row):
@@ -310,132 +405,144 @@ def process_sheet_with_validation(wb_input, wb_output, doctype, skip_links, star
         # Create output sheet
         ws_output = wb_output.create_sheet(title=doctype)
         new_headers = ["Error Detected", "No. of Error", "DetailsMessage"] + headers
-        ws_output.append(new_headers)
-        
-        for cell in ws_output[1]:
+        header_cells = []
+        for h in new_headers:
+            cell = WriteOnlyCell(ws_output, value=h)
             cell.font = HEADER_FONT
             cell.fill = HEADER_FILL
+            header_cells.append(cell)
+        ws_output.append(header_cells)
 
         # Load metadata
-        print(f"[INFO] Loading DocType metadata...")
+        log(f"[INFO] Loading DocType metadata...")
         meta, meta_err = safe_get_meta(doctype)
         if meta_err:
             return create_error_sheet(wb_output, doctype, "DOCTYPE_ERROR", 
                                      f"Failed to load DocType metadata")
 
-        # LINK VALIDATION PREFETCH with detailed logging
-        if not skip_links:
-            print(f"\n[LINK VALIDATION] Starting prefetch...")
-            prefetch_start = time.time()
-            prefetch_link_caches(doctype, meta)
-            prefetch_time = time.time() - prefetch_start
-            print(f"[LINK VALIDATION] Prefetch completed in {prefetch_time:.2f}s\n")
-        else:
-            print(f"[INFO] Link validation SKIPPED\n")
-
         # Build field mappings
-        headers_norm = {clean_header(h): h for h in headers}
+        header_keys = {h: clean_header(h) for h in headers}
+        headers_norm = {key: h for h, key in header_keys.items()}
         header_index_map = {h: i for i, h in enumerate(headers)}
+        # Data columns follow the three error summary columns in the output
+        output_col_map = {h: i + 3 for h, i in header_index_map.items()}
         
-        required_columns = []
-        field_map = build_field_map(meta, headers)
-        
-        for df in meta.fields:
-            if df.reqd and df.fieldtype not in ("Section Break", "Column Break", "Tab Break"):
-                label_norm = clean_header(df.label) if df.label else ""
-                fname_norm = clean_header(df.fieldname) if df.fieldname else ""
-                if label_norm in headers_norm:
-                    required_columns.append(headers_norm[label_norm])
-                elif fname_norm in headers_norm:
-                    required_columns.append(headers_norm[fname_norm])
-
-        print(f"[INFO] Required columns: {required_columns}")
-
-        unique_columns = get_unique_columns(doctype, headers, meta)
-        primary_key = get_primary_key(doctype, headers, meta)
-
-        seen_rows = set()
-        seen_unique = {c: set() for c in unique_columns}
-        seen_primary = set()
+        field_map = build_field_map(meta, headers, header_keys)
+        column_info = build_column_info(headers, field_map, header_keys)
         
+        meta_fields = get_meta_field_norms(meta)
+        required_columns = [
+            h for h in (match_header(headers_norm, *norms) for norms in meta_fields["required"]) if h
+        ]
+
+        log(f"[INFO] Required columns: {required_columns}")
+
+        unique_columns = get_unique_columns(doctype, headers, meta, headers_norm, meta_fields)
+        primary_key = get_primary_key(doctype, headers, meta, headers_norm)
+
+        # Resolve column positions once so rows are read by index
+        required_idx = [(c, header_index_map[c]) for c in required_columns]
+        unique_idx = [(c, header_index_map[c]) for c in unique_columns]
+        pk_idx = header_index_map.get(primary_key) if primary_key else None
+
         total_errors = 0
 
-        # Load all rows
-        all_rows = list(sheet_input.iter_rows(min_row=2, values_only=True))
+        # One value per column: pad short rows, drop empty trailing cells
+        width = len(header_row)
+        all_rows = [r if len(r) == width else (tuple(r) + (None,) * (width - len(r)))[:width] for r in all_rows]
         
-        # Check if rows are actually empty (sometimes iter_rows returns empty tuples)
-        valid_rows = [r for r in all_rows if any(c is not None and str(c).strip() != "" for c in r)]
+        # Check if rows are actually empty (sometimes iter_rows returns empty tuples);
+        # stops at the first filled cell instead of filtering every row
+        has_data = any(c is not None and str(c).strip() != "" for r in all_rows for c in r)
         
-        if not valid_rows:
+        if not has_data:
              return create_error_sheet(wb_output, doctype, "NO_DATA_ROWS", 
                                       "The file contains no data rows.")
                                       
-        print(f"[INFO] Processing {len(all_rows)} data rows...")
+        # LINK VALIDATION PREFETCH with detailed logging
+        if not skip_links:
+            log(f"\n[LINK VALIDATION] Starting prefetch...")
+            prefetch_start = time.time()
+            referenced_links = collect_link_values(all_rows, headers, field_map, header_keys)
+            prefetch_link_caches(doctype, meta, referenced_links, meta_fields)
+            resolve_uncached_links(referenced_links)
+            prefetch_time = time.time() - prefetch_start
+            log(f"[LINK VALIDATION] Prefetch completed in {prefetch_time:.2f}s\n")
+        else:
+            log(f"[INFO] Link validation SKIPPED\n")
 
-        # Process rows
+        log(f"[INFO] Processing {len(all_rows)} data rows...")
+
+        # Column-wise passes over the whole sheet; the row loop only reads their
+        # results. Positions are 0-based indexes into all_rows.
         validation_start = time.time()
-        for row_idx, row in enumerate(all_rows, start=2):
+        empty_rows = [is_empty_row(r) for r in all_rows]
+        missing_required = {
+            col: {pos for pos, r in enumerate(all_rows) if not empty_rows[pos] and is_blank(r[col_idx])}
+            for col, col_idx in required_idx
+        }
+        duplicate_rows = repeated_positions(
+            None if empty else row_signature(r) for r, empty in zip(all_rows, empty_rows)
+        )
+        duplicate_pks = set()
+        if pk_idx is not None:
+            duplicate_pks = repeated_positions(
+                None if empty else key_value(r[pk_idx]) for r, empty in zip(all_rows, empty_rows)
+            )
+        duplicate_uniques = {
+            col: repeated_positions(
+                None if empty else key_value(r[col_idx]) for r, empty in zip(all_rows, empty_rows)
+            )
+            for col, col_idx in unique_idx
+        }
+        dtype_errors_by_row = validate_sheet_columnar(
+            all_rows, headers, column_info, skip_links,
+            skip_rows=empty_rows, deadline=start_time + SHEET_TIMEOUT
+        )
+
+        # Process rows
+        for pos, row in enumerate(all_rows):
+            row_idx = pos + 2
             # Timeout check every 100 rows
             if row_idx % 100 == 0:
                 elapsed = time.time() - start_time
                 if elapsed > SHEET_TIMEOUT:
-                    print(f"[TIMEOUT] Sheet timeout at row {row_idx}")
+                    log(f"[TIMEOUT] Sheet timeout at row {row_idx}")
                     raise ValidationTimeout(f"Sheet {doctype} timeout")
-                print(f"  [PROGRESS] Processed {row_idx-1} rows ({elapsed:.1f}s elapsed)")
-            
-            row_dict = dict(zip(headers, row))
+                log(f"  [PROGRESS] Processed {row_idx-1} rows ({elapsed:.1f}s elapsed)")
             
             short_errors = []
             detailed_errors = []
             failed_columns = set()
 
             # Empty row check
-            if all(v is None or str(v).strip() in ("", "NA", "N/A", "na", "n/a") for v in row_dict.values()):
-                err_code = "EMPTY_ROW"
+            if empty_rows[pos]:
                 msg = "Row is completely empty"
                 short_errors.append("Empty row")
                 detailed_errors.append(msg)
                 
-                json_errors.append({
-                    "sheet": doctype,
-                    "row": row_idx,
-                    "column": "Entire Row",
-                    "code": "Empty Row",
-                    "message": msg,
-                    "value_entered": "",
-                    "error_type": "Empty Row"
-                })
+                json_errors.append(make_json_error(doctype, row_idx, "Entire Row", "EMPTY_ROW", msg))
             else:
                 # Required fields
-                for col in required_columns:
-                    val = row_dict.get(col)
-                    if val in (None, "", "NA", "N/A"):
-                        err_code = "REQUIRED_FIELD_EMPTY"
+                for col, col_idx in required_idx:
+                    if pos in missing_required[col]:
                         msg = f"Required field '{col}' is empty"
                         
                         short_errors.append(f"{col}: Required field empty")
                         detailed_errors.append(msg)
                         failed_columns.add(col)
 
-                        json_errors.append({
-                            "sheet": doctype,
-                            "row": row_idx,
-                            "column": col,
-                            "code": get_readable_error_code(err_code),
-                            "message": msg,
-                            "value_entered": "",
-                            "error_type": get_formatted_error_type(err_code)
-                        })
+                        json_errors.append(make_json_error(doctype, row_idx, col, "REQUIRED_FIELD_EMPTY", msg))
 
                 # Datatype & Link Validation (with logging)
-                dtype_errors = validate_datatypes(doctype, row_dict, row_idx, headers, meta, skip_links, field_map)
+                dtype_errors = dtype_errors_by_row.get(pos)
                 if dtype_errors:
                     for err in dtype_errors:
-                        col = err.get("column", "")
-                        code = err.get("code", "")
-                        raw_msg = err.get("message", "")
+                        col = err.column
+                        code = err.code
+                        raw_msg = err.message
                         
-                        readable_code = get_readable_error_code(code).strip()
+                        readable_code = get_error_labels(code)[0].strip()
                         
                         if col:
                             short_errors.append(f"{col}: {readable_code}")
@@ -444,7 +551,7 @@ def process_sheet_with_validation(wb_input, wb_output, doctype, skip_links, star
                             short_errors.append(readable_code)
 
                         detail_msg = raw_msg
-                        suggestions = err.get("suggestions", [])
+                        suggestions = err.suggestions
                         if suggestions:
                             detail_msg += f" Suggest: {', '.join(str(s) for s in suggestions)}"
                         
@@ -453,85 +560,44 @@ def process_sheet_with_validation(wb_input, wb_output, doctype, skip_links, star
                         
                         detailed_errors.append(detail_msg)
 
-                        val_entered = row_dict.get(col) if col else ""
-                        err_object = {
-                            "sheet": doctype,
-                            "row": row_idx,
-                            "column": col,
-                            "code": get_readable_error_code(code),
-                            "message": raw_msg,
-                            "value_entered": str(val_entered) if val_entered is not None else "",
-                            "error_type": get_formatted_error_type(code)
-                        }
+                        val_entered = row[header_index_map[col]] if col in header_index_map else ""
+                        err_object = make_json_error(doctype, row_idx, col, code, raw_msg, val_entered)
                         if suggestions:
                             err_object["suggestions"] = suggestions
                         json_errors.append(err_object)
 
                 # Duplicate row check
-                row_values = tuple((str(v) if v not in (None, "", "NA", "N/A") else "") for v in row_dict.values())
-                if row_values and row_values in seen_rows:
+                if pos in duplicate_rows:
                     short_errors.append("Duplicate row")
                     detailed_errors.append("Duplicate row")
                     
-                    json_errors.append({
-                        "sheet": doctype,
-                        "row": row_idx,
-                        "column": "Entire Row",
-                        "code": get_readable_error_code("DUPLICATE_ROW"),
-                        "message": "This row is a duplicate of a previous row",
-                        "value_entered": "Row Data",
-                        "error_type": get_formatted_error_type("DUPLICATE_ROW")
-                    })
-                seen_rows.add(row_values)
+                    json_errors.append(make_json_error(
+                        doctype, row_idx, "Entire Row", "DUPLICATE_ROW",
+                        "This row is a duplicate of a previous row", "Row Data"
+                    ))
 
                 # Primary key duplicate
-                if primary_key:
-                    pk_val = row_dict.get(primary_key)
-                    if pk_val and pk_val not in (None, "", "NA", "N/A"):
-                        pk_str = str(pk_val).strip()
-                        if pk_str in seen_primary:
-                            err_code = "DUPLICATE_PRIMARY_KEY"
-                            msg = f"{primary_key}: Duplicate ID ({pk_val})"
-                            
-                            short_errors.append(f"{primary_key}: Duplicate ID")
-                            detailed_errors.append(msg)
-                            failed_columns.add(primary_key)
-
-                            json_errors.append({
-                                "sheet": doctype,
-                                "row": row_idx,
-                                "column": primary_key,
-                                "code": get_readable_error_code(err_code),
-                                "message": msg,
-                                "value_entered": str(pk_val),
-                                "error_type": get_formatted_error_type(err_code)
-                            })
-                        seen_primary.add(pk_str)
+                if pos in duplicate_pks:
+                    pk_val = row[pk_idx]
+                    msg = f"{primary_key}: Duplicate ID ({pk_val})"
+                    
+                    short_errors.append(f"{primary_key}: Duplicate ID")
+                    detailed_errors.append(msg)
+                    failed_columns.add(primary_key)
+
+                    json_errors.append(make_json_error(doctype, row_idx, primary_key, "DUPLICATE_PRIMARY_KEY", msg, pk_val))
 
                 # Unique value duplicate
-                for col in unique_columns:
-                    val = row_dict.get(col)
-                    if val and val not in (None, "", "NA", "N/A"):
-                        val_str = str(val).strip()
-                        if val_str in seen_unique[col]:
-                            err_code = "DUPLICATE_UNIQUE"
-                            msg = f"{col}: Duplicate value ({val})"
-                            
-                            short_errors.append(f"{col}: Duplicate value")
-                            detailed_errors.append(msg)
-                            failed_columns.add(col)
-                            
-                            json_errors.append({
-                                "sheet": doctype,
-                                "row": row_idx,
-                                "column": col,
-                                "code": get_readable_error_code(err_code),
-                                "message": msg,
-                                "value_entered": str(val),
-                                "error_type": get_formatted_error_type(err_code)
-                            })
-
-                        seen_unique[col].add(val_str)
+                for col, col_idx in unique_idx:
+                    if pos in duplicate_uniques[col]:
+                        val = row[col_idx]
+                        msg = f"{col}: Duplicate value ({val})"
+                        
+                        short_errors.append(f"{col}: Duplicate value")
+                        detailed_errors.append(msg)
+                        failed_columns.add(col)
+                        
+                        json_errors.append(make_json_error(doctype, row_idx, col, "DUPLICATE_UNIQUE", msg, val))
 
             # Write row
             has_error = len(short_errors) > 0
@@ -544,33 +610,28 @@ def process_sheet_with_validation(wb_input, wb_output, doctype, skip_links, star
             detail_val = "; ".join(detailed_errors) if detailed_errors else "No Error"
             
             output_row_data = [error_val, error_count, detail_val]
-            for h in headers:
-                val = row_dict.get(h)
-                output_row_data.append(val)
-            
-            ws_output.append(output_row_data)
-            
-            # Highlighting
-            current_excel_row = ws_output.max_row
+            output_row_data.extend(row[:len(headers)])
             
+            # Write-only sheets can't be styled after append, so only the
+            # highlighted values are wrapped in pre-styled cells
             if has_error:
-                cell = ws_output.cell(row=current_excel_row, column=1)
-                cell.font = ERROR_TEXT_COLOR
-
-                cell_count = ws_output.cell(row=current_excel_row, column=2)
-                cell_count.font = ERROR_TEXT_COLOR
+                for i in (0, 1):
+                    cell = WriteOnlyCell(ws_output, value=output_row_data[i])
+                    cell.font = ERROR_TEXT_COLOR
+                    output_row_data[i] = cell
             
             for col_name in failed_columns:
-                if col_name in header_index_map:
-                    col_idx = header_index_map[col_name]
-                    excel_col_idx = col_idx + 4
-                    
-                    cell = ws_output.cell(row=current_excel_row, column=excel_col_idx)
+                if col_name in output_col_map:
+                    i = output_col_map[col_name]
+                    cell = WriteOnlyCell(ws_output, value=output_row_data[i])
                     cell.fill = ERROR_FILL
                     cell.font = ERROR_TEXT_COLOR
+                    output_row_data[i] = cell
+            
+            ws_output.append(output_row_data)
 
         validation_time = time.time() - validation_start
-        print(f"[TIMING] Row validation completed in {validation_time:.2f}s")
+        log(f"[TIMING] Row validation completed in {validation_time:.2f}s")
 
         return {
             "sheet_name": doctype,
@@ -591,55 +652,132 @@ def process_sheet_with_validation(wb_input, wb_output, doctype, skip_links, star
 
 # ================= LINK VALIDATION WITH LOGGING =================
 
-def prefetch_link_caches(doctype, meta=None):
+def collect_link_values(rows, headers, field_map, header_keys=None):
     """
-    WITH DETAILED LOGGING: Shows exactly what's happening
+    Distinct non-empty values per linked DocType referenced by the sheet
+    """
+    if header_keys is None:
+        header_keys = {h: clean_header(h) for h in headers}
+    referenced = {}
+    for col_idx, h in enumerate(headers):
+        df = field_map.get(header_keys[h])
+        if not df or df.fieldtype != "Link" or not df.options:
+            continue
+        names = referenced.setdefault(df.options, set())
+        for row in rows:
+            value = row[col_idx]
+            if value is not None:
+                value = str(value).strip()
+                if value:
+                    names.add(value)
+    return referenced
+
+
+def fetch_existing_link_names(doctype, names):
+    """
+    Which of `names` exist in `doctype`, one "name IN (...)" query per chunk
     """
-    if meta is None:
+    names = list(names)
+    found = set()
+    for i in range(0, len(names), LINK_QUERY_CHUNK):
+        chunk = names[i:i + LINK_QUERY_CHUNK]
+        found.update(frappe.get_all(doctype, filters={"name": ("in", chunk)}, pluck="name"))
+    return found
+
+
+def resolve_uncached_links(referenced):
+    """
+    Bulk-resolve the names in `referenced` (collect_link_values) of linked DocTypes
+    the prefetch didn't cache (e.g. it failed), so validate_link_field never
+    queries cell by cell
+    """
+    for linked_dt, names in referenced.items():
+        if not names or linked_dt in _link_cache:
+            continue
         try:
-            meta = frappe.get_meta(doctype)
-        except:
-            return
+            set_link_cache(linked_dt, fetch_existing_link_names(linked_dt, names))
+        except Exception as e:
+            log(f"  [LINK] {linked_dt}: bulk lookup failed, checking per value ({str(e)})")
+
+
+def prefetch_link_caches(doctype, meta=None, referenced=None, meta_fields=None):
+    """
+    WITH DETAILED LOGGING: Shows exactly what's happening
+
+    Small DocTypes are cached whole. For DocTypes over LINK_CACHE_LIMIT only
+    the names in `referenced` (linked DocType -> names used by the sheet) are
+    resolved, so validation never has to query row by row.
+    """
+    if meta_fields is None:
+        if meta is None:
+            try:
+                meta = frappe.get_meta(doctype)
+            except:
+                return
+        meta_fields = get_meta_field_norms(meta)
     
-    link_doctypes = set()
-    for df in meta.fields:
-        if df.fieldtype == "Link" and df.options:
-            link_doctypes.add(df.options)
+    link_doctypes = set(meta_fields["links"])
     
     if not link_doctypes:
-        print(f"  [LINK] No link fields found")
+        log(f"  [LINK] No link fields found")
         return
     
-    print(f"  [LINK] Found {len(link_doctypes)} link fields to process")
+    log(f"  [LINK] Found {len(link_doctypes)} link fields to process")
     
     for idx, linked_dt in enumerate(link_doctypes, 1):
         try:
-            print(f"  [{idx}/{len(link_doctypes)}] {linked_dt}:")
+            log(f"  [{idx}/{len(link_doctypes)}] {linked_dt}:")
+            # Never validate against names cached by an earlier request
+            clear_link_cache(linked_dt)
             
-            # Count
-            count_start = time.time()
-            count = frappe.db.count(linked_dt)
-            count_time = time.time() - count_start
-            print(f"      Count: {count:,} records ({count_time:.2f}s)")
+            # Fetch one past the limit so oversized DocTypes show up without a count query
+            cache_start = time.time()
+            all_names = fetch_link_names(linked_dt)
+            cache_time = time.time() - cache_start
             
-            _link_cache_sizes[linked_dt] = count
+            _link_cache_sizes[linked_dt] = len(all_names)
             
-            if count > LINK_CACHE_LIMIT:
-                print(f"      ⚠️  SKIPPING cache (exceeds {LINK_CACHE_LIMIT:,} limit)")
-                print(f"      Will use direct DB queries")
+            if len(all_names) > LINK_CACHE_LIMIT:
+                log(f"      ⚠️  SKIPPING full cache (exceeds {LINK_CACHE_LIMIT:,} limit)")
+                names = (referenced or {}).get(linked_dt)
+                if names:
+                    cache_start = time.time()
+                    set_link_cache(linked_dt, fetch_existing_link_names(linked_dt, names))
+                    cache_time = time.time() - cache_start
+                    log(f"      ✅ Resolved {len(names):,} referenced names, "
+                        f"{len(_link_cache[linked_dt]):,} found ({cache_time:.2f}s)")
                 continue
             
             # Cache
-            cache_start = time.time()
-            _link_cache[linked_dt] = set(frappe.get_all(linked_dt, pluck="name"))
-            cache_time = time.time() - cache_start
+            set_link_cache(linked_dt, all_names)
             
-            print(f"      ✅ Cached {len(_link_cache[linked_dt]):,} records ({cache_time:.2f}s)")
+            log(f"      ✅ Cached {len(_link_cache[linked_dt]):,} records ({cache_time:.2f}s)")
             
         except Exception as e:
             print(f"      ❌ ERROR: {str(e)}")
 
 
+def fetch_link_names(doctype):
+    """
+    Up to LINK_CACHE_LIMIT + 1 names; more than the limit means the DocType is too large to cache
+    """
+    return frappe.get_all(doctype, pluck="name", limit_page_length=LINK_CACHE_LIMIT + 1, order_by=None)
+
+
+def set_link_cache(doctype, names):
+    _link_cache[doctype] = set(names)
+    _link_cache_cf[doctype] = {str(n).casefold(): n for n in _link_cache[doctype]}
+    _link_suggestion_cache[doctype] = {}
+    _link_exists_cache.pop(doctype, None)
+
+
+def clear_link_cache(doctype):
+    _link_cache.pop(doctype, None)
+    _link_cache_cf.pop(doctype, None)
+    _link_suggestion_cache.pop(doctype, None)
+    _link_exists_cache.pop(doctype, None)
+
+
 def link_exists(doctype, name, case_sensitive=False):
     """
     WITH LOGGING for large table queries
@@ -648,7 +786,7 @@ def link_exists(doctype, name, case_sensitive=False):
         return False
     
     try:
-        if not frappe.db.exists("DocType", doctype):
+        if not frappe.get_cached_value("DocType", doctype, "name"):
             return False
         
         # Large table check
@@ -663,13 +801,13 @@ def link_exists(doctype, name, case_sensitive=False):
         # Cache-based lookup
         if doctype not in _link_cache:
             try:
-                count = frappe.db.count(doctype)
-                if count > LINK_CACHE_LIMIT:
-                    _link_cache_sizes[doctype] = count
+                all_names = fetch_link_names(doctype)
+                if len(all_names) > LINK_CACHE_LIMIT:
+                    _link_cache_sizes[doctype] = len(all_names)
                     result = frappe.db.exists(doctype, name)
                     return bool(result)
                 else:
-                    _link_cache[doctype] = set(frappe.get_all(doctype, pluck="name"))
+                    set_link_cache(doctype, all_names)
             except:
                 return False
         
@@ -677,11 +815,7 @@ def link_exists(doctype, name, case_sensitive=False):
         if case_sensitive:
             return name_str in _link_cache[doctype]
         
-        name_lower = name_str.lower()
-        for cached_name in _link_cache[doctype]:
-            if str(cached_name).lower() == name_lower:
-                return True
-        return False
+        return name_str.casefold() in _link_cache_cf[doctype]
     except Exception:
         return False
 
@@ -692,36 +826,51 @@ def get_link_suggestions(doctype, name, max_suggestions=3):
             link_exists(doctype, "__init__")
         except:
             return []
-    name_lower = str(name).lower()
+    folded = _link_cache_cf.get(doctype)
+    if not folded:
+        return []
+
+    name_cf = str(name).casefold()
+    memo = _link_suggestion_cache.setdefault(doctype, {})
+    key = (name_cf, max_suggestions)
+    if key in memo:
+        return list(memo[key])
+
     suggestions = []
-    if doctype in _link_cache:
-        for cached_name in _link_cache[doctype]:
-            if name_lower in str(cached_name).lower() or str(cached_name).lower() in name_lower:
-                suggestions.append(cached_name)
-                if len(suggestions) >= max_suggestions:
-                    break
-    return suggestions
+    for cached_cf, cached_name in folded.items():
+        if name_cf in cached_cf or cached_cf in name_cf:
+            suggestions.append(cached_name)
+            if len(suggestions) >= max_suggestions:
+                break
+
+    # Fuzzy matching is only worth paying for when no substring matched, and it
+    # scans every cached name, so keep it to small DocTypes and a bounded number of values
+    if not suggestions and len(folded) <= FUZZY_SUGGESTION_NAMES and len(memo) < FUZZY_SUGGESTION_MISSES:
+        matches = difflib.get_close_matches(name_cf, folded, n=max_suggestions, cutoff=0.6)
+        suggestions = [folded[m] for m in matches]
+
+    memo[key] = suggestions
+    return list(suggestions)
 
 
 # ================= UTILITY FUNCTIONS (same as before) =================
 
+def log(msg):
+    if VERBOSE_LOGGING:
+        print(msg)
+
+
 def create_error_sheet(wb_output, sheet_name, error_code, error_message):
     ws_output = wb_output.create_sheet(title=sheet_name)
-    ws_output.append(["ERROR", error_message])
-    ws_output["A1"].fill = ERROR_FILL
-    ws_output["A1"].font = ERROR_TEXT_COLOR
-    ws_output["B1"].fill = ERROR_FILL
-    ws_output["B1"].font = ERROR_TEXT_COLOR
+    error_cells = []
+    for value in ("ERROR", error_message):
+        cell = WriteOnlyCell(ws_output, value=value)
+        cell.fill = ERROR_FILL
+        cell.font = ERROR_TEXT_COLOR
+        error_cells.append(cell)
+    ws_output.append(error_cells)
     
-    json_error = {
-        "sheet": sheet_name,
-        "row": 0,
-        "column": "Sheet",
-        "code": get_readable_error_code(error_code),
-        "message": error_message,
-        "value_entered": "",
-        "error_type": get_formatted_error_type(error_code)
-    }
+    json_error = make_json_error(sheet_name, 0, "Sheet", error_code, error_message)
 
     return {
         "sheet_name": sheet_name,
@@ -734,6 +883,75 @@ def create_error_sheet(wb_output, sheet_name, error_code, error_message):
     }
 
 
+def is_blank(value):
+    return value is None or value in BLANK_VALUES
+
+
+def filled_width(row):
+    """
+    1-based position of the last non-None cell in `row`, 0 if there is none
+    """
+    for i in range(len(row) - 1, -1, -1):
+        if row[i] is not None:
+            return i + 1
+    return 0
+
+
+def is_empty_row(row):
+    """
+    True if every cell is None or blank text; stops at the first filled cell
+    """
+    for v in row:
+        if v is None:
+            continue
+        s = v if type(v) is str else str(v)
+        if s.strip() not in EMPTY_CELL_VALUES:
+            return False
+    return True
+
+
+def key_value(value):
+    """
+    Stripped text of a primary key / unique cell, None if blank
+    """
+    if not value or is_blank(value):
+        return None
+    return str(value).strip()
+
+
+def repeated_positions(keys):
+    """
+    Positions whose key already appeared at an earlier position; None keys are skipped
+    """
+    seen = set()
+    repeats = set()
+    for pos, key in enumerate(keys):
+        if key is None:
+            continue
+        if key in seen:
+            repeats.add(pos)
+        else:
+            seen.add(key)
+    return repeats
+
+
+def row_signature(values):
+    """
+    Fixed-size digest of a row for duplicate detection, so seen rows don't keep
+    a tuple of strings alive per row
+    """
+    sig = hashlib.blake2b(digest_size=16)
+    for v in values:
+        s = "" if v is None else str(v)
+        if s in BLANK_VALUES:
+            s = ""
+        b = s.encode("utf-8", "surrogatepass")
+        # Length-prefix each value so no two different rows share a byte stream
+        sig.update(len(b).to_bytes(4, "little"))
+        sig.update(b)
+    return sig.digest()
+
+
 def check_doctype_exists(doctype_name):
     try:
         return frappe.db.exists("DocType", doctype_name)
@@ -741,6 +959,29 @@ def check_doctype_exists(doctype_name):
         return False
 
 
+def get_error_labels(code):
+    """
+    (readable code, formatted error type) for an error code
+    """
+    labels = ERROR_CODE_LABEL_PAIRS.get(code)
+    if labels is None:
+        labels = (get_readable_error_code(code), get_formatted_error_type(code))
+    return labels
+
+
+def make_json_error(sheet, row, column, code, message, value_entered=""):
+    readable, error_type = get_error_labels(code)
+    return {
+        "sheet": sheet,
+        "row": row,
+        "column": column,
+        "code": readable,
+        "message": message,
+        "value_entered": "" if value_entered is None else str(value_entered),
+        "error_type": error_type
+    }
+
+
 def get_readable_error_code(code):
     return ERROR_CODE_LABELS.get(code, code.replace('_', ' '))
 
@@ -749,16 +990,19 @@ def get_formatted_error_type(code):
     return ERROR_CODE_LABELS.get(code, code.replace('_', ' ').title())
 
 
+@functools.lru_cache(maxsize=4096)
 def clean_header(h):
     if h is None:
         return ""
-    base = re.sub(r"\s*\(.*\)$", "", str(h).strip(), flags=re.IGNORECASE)
+    base = HEADER_HINT_RE.sub("", str(h).strip())
     return base.lower().replace(" ", "")
 
 
 def safe_response(obj):
     try:
-        return json.loads(json.dumps(obj, default=str, ensure_ascii=False))
+        # Datetimes go through default=str too, matching the old json.dumps output
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        return orjson.loads(orjson.dumps(obj, default=str, option=options))
     except Exception:
         return {"structure_valid": False, "errors": [{"code": "RESPONSE_ERROR", "message": "Serialization Error"}]}
 
@@ -778,44 +1022,53 @@ def fail(code, message):
 
 def convert_to_frappe_format(validation_result):
     message = {}
+    # One timestamp for the whole import; isoformat matches '%Y-%m-%d %H:%M:%S.%f'
+    imported_at = datetime.datetime.now().isoformat(sep=" ", timespec="microseconds")
     
     for sheet_result in validation_result.get("sheet_results", []):
-        sheet_name = sheet_result.get("sheet_name")
-        errors = sheet_result.get("json_errors", [])
-        
-        logs = []
-        warnings = []
+        message[sheet_result.get("sheet_name")] = sheet_import_message(sheet_result, imported_at)
+    
+    return {"message": message}
+
+
+def sheet_import_message(sheet_result, imported_at):
+    """
+    Data Import style summary (logs, warnings, status) of one sheet's result
+    """
+    sheet_name = sheet_result.get("sheet_name")
+    errors = sheet_result.get("json_errors", [])
+    
+    logs = []
+    warnings = []
+    
+    for err in errors:
+        row = err.get("row", 0)
         
-        for err in errors:
-            row = err.get("row", 0)
+        if row > 0:
+            # Regular error log
+            logs.append({
+                "rows": [row],
+                "status": "error",
+                "document": None,
+                "message": err.get("message", "")
+            })
+        else:
+            # Column-level warning
+            col = err.get("column", "")
+            col_num = int(col[7:]) if col.startswith("Column ") else 0
             
-            if row > 0:
-                # Regular error log
-                logs.append({
-                    "rows": [row],
-                    "status": "error",
-                    "document": None,
-                    "message": err.get("message", "")
-                })
-            else:
-                # Column-level warning
-                col = err.get("column", "")
-                col_num = int(col.replace("Column ", "")) if "Column" in col else 0
-                
-                warnings.append({
-                    "col": col_num,
-                    "message": err.get("message", ""),
-                    "type": "warning"
-                })
-        
-        message[sheet_name] = {
-            "data_import": f"{sheet_name} Import on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')}",
-            "status": "Error" if errors else "Success",
-            "logs": logs,
-            "warnings": warnings
-        }
+            warnings.append({
+                "col": col_num,
+                "message": err.get("message", ""),
+                "type": "warning"
+            })
     
-    return {"message": message}
+    return {
+        "data_import": f"{sheet_name} Import on {imported_at}",
+        "status": "Error" if errors else "Success",
+        "logs": logs,
+        "warnings": warnings
+    }
 
 
 def safe_get_meta(doctype):
@@ -825,22 +1078,53 @@ def safe_get_meta(doctype):
         return None, fail("DOCTYPE_ERROR", str(e))
 
 
-def get_unique_columns(doctype, headers, meta):
-    headers_norm = {clean_header(h): h for h in headers}
-    cols = []
+def get_meta_field_norms(meta):
+    """
+    Normalized (label, fieldname) pairs of the required and unique fields and
+    the Link targets of a DocType. Callers build it once per sheet; it isn't cached
+    across requests since Property Setters/Custom Fields don't bump meta.modified
+    """
+    required, unique, links = [], [], []
     for df in meta.fields:
+        norms = (
+            clean_header(df.label) if df.label else "",
+            clean_header(df.fieldname) if df.fieldname else "",
+        )
+        if df.reqd and df.fieldtype not in ("Section Break", "Column Break", "Tab Break"):
+            required.append(norms)
         if getattr(df, "unique", False):
-            label_norm = clean_header(df.label) if df.label else ""
-            fname_norm = clean_header(df.fieldname) if df.fieldname else ""
-            if label_norm in headers_norm:
-                cols.append(headers_norm[label_norm])
-            elif fname_norm in headers_norm:
-                cols.append(headers_norm[fname_norm])
+            unique.append(norms)
+        if df.fieldtype == "Link" and df.options:
+            links.append(df.options)
+
+    return {"required": tuple(required), "unique": tuple(unique), "links": tuple(links)}
+
+
+def match_header(headers_norm, label_norm, fname_norm):
+    """
+    Sheet header for a field, matched by label first and then by fieldname
+    """
+    if label_norm in headers_norm:
+        return headers_norm[label_norm]
+    return headers_norm.get(fname_norm)
+
+
+def get_unique_columns(doctype, headers, meta, headers_norm=None, meta_fields=None):
+    if headers_norm is None:
+        headers_norm = {clean_header(h): h for h in headers}
+    if meta_fields is None:
+        meta_fields = get_meta_field_norms(meta)
+    cols = []
+    for norms in meta_fields["unique"]:
+        h = match_header(headers_norm, *norms)
+        if h:
+            cols.append(h)
     return cols
 
 
-def get_primary_key(doctype, headers, meta):
-    headers_norm = {clean_header(h): h for h in headers}
+def get_primary_key(doctype, headers, meta, headers_norm=None):
+    if headers_norm is None:
+        headers_norm = {clean_header(h): h for h in headers}
     for df in meta.fields:
         if df.fieldname == "name":
             label_norm = clean_header(df.label) if df.label else ""
@@ -851,8 +1135,8 @@ def get_primary_key(doctype, headers, meta):
     return None
 
 
-def build_field_map(meta, headers=None):
-    print(f"[DEBUG] build_field_map called. Meta Fields: {len(meta.fields)} Headers: {len(headers) if headers else 0}")
+def build_field_map(meta, headers=None, header_keys=None):
+    log(f"[DEBUG] build_field_map called. Meta Fields: {len(meta.fields)} Headers: {len(headers) if headers else 0}")
     field_map = {}
     
     # Use meta.fields if available
@@ -868,9 +1152,11 @@ def build_field_map(meta, headers=None):
     
     # If meta.fields is empty and headers provided, create fields from headers
     if not field_map and headers:
-        for h in headers:
-            key = clean_header(h)
+        if header_keys is None:
+            header_keys = {h: clean_header(h) for h in headers}
+        for h, key in header_keys.items():
             h_lower = str(h).lower()
+            words = set(HEADER_WORD_RE.findall(h_lower))
             
             # Determine fieldtype based on header name
             if key == "year":
@@ -878,12 +1164,12 @@ def build_field_map(meta, headers=None):
             elif "date" in h_lower:
                 fieldtype = "Date"
             # Prioritize Financial/Amount columns
-            elif re.search(r'\b(financial|budget|amount|cost|price|rate)\b', h_lower):
+            elif not words.isdisjoint(CURRENCY_HEADER_WORDS):
                 fieldtype = "Currency" if "rate" in h_lower or "price" in h_lower or "financial" in h_lower else "Float"
-                print(f"[DEBUG-MAP] Header: {h} -> Type: {fieldtype}")
+                log(f"[DEBUG-MAP] Header: {h} -> Type: {fieldtype}")
             
             # Other numeric indicators
-            elif re.search(r'\b(count|total|value|qty|quantity|ranking|index|strength|position|vacant|ratio|currency)\b', h_lower):
+            elif not words.isdisjoint(NUMERIC_HEADER_WORDS):
                 # Skip if it's a text column like "Case Number & Title"
                 if "&" in h_lower or "title" in h_lower or "case" in h_lower or "name" in h_lower:
                     fieldtype = "Data"
@@ -893,99 +1179,138 @@ def build_field_map(meta, headers=None):
                 fieldtype = "Data"
             
             # Create simple field object
-            class SimpleField:
-                pass
-            df = SimpleField()
-            df.label = h
-            df.fieldname = key
-            df.fieldtype = fieldtype
-            df.reqd = 0
-            df.unique = 0
-            df.options = None
-            
-            field_map[key] = df
+            field_map[key] = SimpleField(label=h, fieldname=key, fieldtype=fieldtype)
     
     return field_map
 
 
 
-def validate_datatypes(doctype, row_dict, row_idx, headers, meta, skip_link_validation, field_map=None):
-    if field_map is None:
-        field_map = build_field_map(meta, headers)
-
-    errors = []
-    
-    # Columns that can be empty (system fields, notes, descriptions)
-    optional_columns = ("id", "institute", "notes", "description", "brief", "details", "remarks", "comments")
-    
-    for label, value in row_dict.items():
-        original_value = value
-        key = clean_header(label)
+def build_column_info(headers, field_map, header_keys=None):
+    """
+    (df, fieldtype, is_optional, is_year_field) per header, resolved once per sheet
+    """
+    if header_keys is None:
+        header_keys = {h: clean_header(h) for h in headers}
+    column_info = {}
+    for label in headers:
+        key = header_keys[label]
+        label_lower = label.lower()
         
         # Skip checking system/optional columns for emptiness
-        is_optional = key in optional_columns or label.lower().startswith("id ")
-        
-        # Check for empty values in non-optional columns
-        # Treat whitespace as empty
-        str_val = str(value).strip() if value is not None else ""
-        
-        if str_val == "" or str_val in ("NA", "N/A", "na", "n/a"):
-            if not is_optional:
-                errors.append({
-                    "row": row_idx, 
-                    "column": label, 
-                    "code": "REQUIRED_FIELD_EMPTY", 
-                    "message": f"Field '{label}' is empty"
-                })
-            continue
+        is_optional = key in OPTIONAL_COLUMNS or label_lower.startswith("id ")
         
         df = field_map.get(key)
         
         # Fallback for Year column if not in map but detected by name
-        is_year_by_name = "year" in label.lower() and len(label) < 15
+        is_year_by_name = "year" in label_lower and len(label) < 15
         
-        if not df:
-            if is_year_by_name:
-                class DummyField: fieldtype = "Int"; fieldname = "year"
-                df = DummyField()
-            else:
-                continue
-        
-        ft = df.fieldtype
+        if not df and is_year_by_name:
+            df = SimpleField(fieldname="year", fieldtype="Int")
         
-        if "financial" in label.lower() and ft == "Currency":
-             pass
+        ft = df.fieldtype if df else None
+        is_year_field = bool(df) and (
+            key == "year" or key.endswith("_year") or getattr(df, "fieldname", "") == "year" or is_year_by_name
+        )
+        column_info[label] = (df, ft, is_optional, is_year_field)
+    return column_info
 
-        # Year validation
-        is_year_field = key == "year" or key.endswith("_year") or getattr(df, "fieldname", "") == "year" or is_year_by_name
 
-        if is_year_field:
-            y = validate_year_value(value)
-            if y is None:
-                errors.append({"row": row_idx, "column": label, "code": "INVALID_YEAR", "message": f"Invalid year: {value}"})
+def validate_sheet_columnar(rows, headers, column_info, skip_link_validation, skip_rows=None, first_row=2,
+                            deadline=None):
+    """
+    Column-at-a-time datatype/link validation of a whole sheet.
+    Returns {row position: [CellError]} in header order;
+    rows flagged in `skip_rows` are not checked.
+    """
+    errors_by_row = {}
+    max_year = datetime.date.today().year + 1
+    found = []
+
+    for col_idx, label in enumerate(headers):
+        column = column_info[label]
+        df, ft, is_optional, is_year_field = column
+        # Typed cells openpyxl already parsed as numbers/dates need no per-cell checks
+        valid_types = VALID_CELL_TYPES.get(ft) if df and not is_year_field else None
+        # Numeric year cells only need the range check; int() truncation keeps
+        # [MIN_YEAR, max_year + 1) equivalent to validate_value's check
+        year_end = max_year + 1 if df and is_year_field and ft != "Link" else None
+        seen = {}  # (type, value) -> that value's errors
+
+        for pos, row in enumerate(rows):
+            # Deadline check every 100 rows, as the row loop does, so one slow column can't overrun it
+            if deadline and pos % 100 == 0 and time.time() > deadline:
+                raise ValidationTimeout(f"Timed out validating column {label} at row {pos + first_row}")
+            if skip_rows and skip_rows[pos]:
                 continue
-            if not (1900 <= int(y) <= datetime.date.today().year + 1):
-                # print(f"[DEBUG-YEAR-CHECK] FAIL RANGE: {y}")
-                errors.append({"row": row_idx, "column": label, "code": "INVALID_YEAR_RANGE", "message": f"Year {y} out of allowed range 1900-{datetime.date.today().year + 1}"})
-            if ft != "Link":
+            value = row[col_idx]
+            if valid_types and type(value) in valid_types:
                 continue
+            if year_end and type(value) in YEAR_NUMBER_TYPES and MIN_YEAR <= value < year_end:
+                continue
+            # Repeated values (Year, Institute, Status...) are validated once per column;
+            # keyed on type too so 1, 1.0 and True keep their own messages
+            key = (type(value), value)
+            cell_errors = seen.get(key)
+            if cell_errors is None:
+                validate_value(found, label, value, column, 0, skip_link_validation, max_year)
+                cell_errors = seen[key] = tuple(found)
+                found.clear()
+            if cell_errors:
+                row_idx = pos + first_row
+                errors_by_row.setdefault(pos, []).extend(e._replace(row=row_idx) for e in cell_errors)
+
+    return errors_by_row
+
+
+def validate_value(errors, label, value, column, row_idx, skip_link_validation, max_year):
+    """
+    Append the datatype/link CellErrors of one cell to `errors`; `column` is its build_column_info entry
+    """
+    original_value = value
+    df, ft, is_optional, is_year_field = column
+    
+    # Check for empty values in non-optional columns
+    # Treat whitespace as empty
+    str_val = str(value).strip() if value is not None else ""
+    
+    if str_val in EMPTY_CELL_VALUES:
+        if not is_optional:
+            errors.append(CellError(row_idx, label, "REQUIRED_FIELD_EMPTY", f"Field '{label}' is empty"))
+        return
+    
+    if not df:
+        return
 
-        # Link validation
-        if ft == "Link":
-            link_err = validate_link_field(df, value, label, row_idx, skip_link_validation, original_value)
-            if link_err:
-                errors.append(link_err)
-            continue
-        
-        # Numeric/Date checks
-        if ft in ("Int", "Check"):
-            # Try to validate/convert to integer
-            is_valid_int = False
-            if isinstance(value, (int, bool)):
-                is_valid_int = True
-            elif isinstance(value, float) and value.is_integer():
+    # Year validation
+    if is_year_field:
+        y = validate_year_value(value)
+        if y is None:
+            errors.append(CellError(row_idx, label, "INVALID_YEAR", f"Invalid year: {value}"))
+            return
+        if not (MIN_YEAR <= int(y) <= max_year):
+            errors.append(CellError(row_idx, label, "INVALID_YEAR_RANGE", f"Year {y} out of allowed range {MIN_YEAR}-{max_year}"))
+        if ft != "Link":
+            return
+
+    # Link validation
+    if ft == "Link":
+        link_err = validate_link_field(df, value, label, row_idx, skip_link_validation, original_value)
+        if link_err:
+            errors.append(link_err)
+        return
+    
+    # Numeric/Date checks
+    if ft in ("Int", "Check"):
+        # Try to validate/convert to integer
+        is_valid_int = False
+        if isinstance(value, (int, bool)):
+            is_valid_int = True
+        elif isinstance(value, float) and value.is_integer():
+            is_valid_int = True
+        elif isinstance(value, str):
+            if INT_STR_RE.fullmatch(value.strip()):
                 is_valid_int = True
-            elif isinstance(value, str):
+            else:
                 try:
                     # Try to convert string to number
                     num_val = float(value.strip())
@@ -993,33 +1318,34 @@ def validate_datatypes(doctype, row_dict, row_idx, headers, meta, skip_link_vali
                         is_valid_int = True
                 except (ValueError, AttributeError):
                     pass
-            
-            if not is_valid_int:
-                errors.append({"row": row_idx, "column": label, "code": "INVALID_INT", "message": f"'{value}' is not a valid number"})
         
-        elif ft in ("Float", "Currency", "Percent"):
-            # Try to validate/convert to float
-            is_valid_float = False
-            if isinstance(value, (int, float)):
+        if not is_valid_int:
+            errors.append(CellError(row_idx, label, "INVALID_INT", f"'{value}' is not a valid number"))
+    
+    elif ft in ("Float", "Currency", "Percent"):
+        # Try to validate/convert to float
+        is_valid_float = False
+        if isinstance(value, (int, float)):
+            is_valid_float = True
+        elif isinstance(value, str):
+            if FLOAT_STR_RE.fullmatch(value.strip()):
                 is_valid_float = True
-            elif isinstance(value, str):
+            else:
                 try:
                     # Try to convert string to float
                     float(value.strip())
                     is_valid_float = True
                 except (ValueError, AttributeError):
                     pass
-            
-            if not is_valid_float:
-                errors.append({"row": row_idx, "column": label, "code": "INVALID_FLOAT", "message": f"'{value}' is not a valid number"})
-        elif ft == "Date":
-            if not isinstance(value, (datetime.date, datetime.datetime)):
-                errors.append({"row": row_idx, "column": label, "code": "INVALID_DATE", "message": "Invalid date format"})
-        elif ft == "Datetime":
-            if not isinstance(value, datetime.datetime):
-                errors.append({"row": row_idx, "column": label, "code": "INVALID_DATETIME", "message": "Invalid datetime format"})
-
-    return errors
+        
+        if not is_valid_float:
+            errors.append(CellError(row_idx, label, "INVALID_FLOAT", f"'{value}' is not a valid number"))
+    elif ft == "Date":
+        if not isinstance(value, (datetime.date, datetime.datetime)):
+            errors.append(CellError(row_idx, label, "INVALID_DATE", "Invalid date format"))
+    elif ft == "Datetime":
+        if not isinstance(value, datetime.datetime):
+            errors.append(CellError(row_idx, label, "INVALID_DATETIME", "Invalid datetime format"))
 
 
 def validate_year_value(value):
@@ -1027,11 +1353,16 @@ def validate_year_value(value):
         return value.year
     if isinstance(value, (int, float)):
         return int(value)
-    if isinstance(value, str) and re.fullmatch(r"\d{4}", value.strip()):
+    if isinstance(value, str) and YEAR_STR_RE.fullmatch(value.strip()):
         return int(value.strip())
+    # ISO dates start with a 4-digit year and are at least "YYYYWww" long;
+    # anything else can't parse, so don't pay for the raised ValueError
+    text = str(value)
+    if len(text) < 7 or not text[:4].isdigit():
+        return None
     try:
-        return datetime.datetime.fromisoformat(str(value)).year
-    except:
+        return datetime.datetime.fromisoformat(text).year
+    except ValueError:
         return None
 
 
@@ -1041,33 +1372,30 @@ def validate_link_field(df, value, label, row_idx, skip_link_validation, origina
     
     linked_doctype = df.options
     if not linked_doctype:
-        return {
-            "row": row_idx,
-            "column": label,
-            "code": "LINK_CONFIG_ERROR",
-            "message": "No target DocType"
-        }
+        return CellError(row_idx, label, "LINK_CONFIG_ERROR", "No target DocType")
 
     value_str = str(value).strip()
 
-    # 1️⃣ Direct DB exists check first (most reliable)
-    if frappe.db.exists(linked_doctype, value_str):
-        return None
+    # 1️⃣ Exact check against the names prefetched for this sheet, or a
+    # direct DB check if the DocType couldn't be cached
+    existing = _link_cache.get(linked_doctype)
+    if existing is not None:
+        if value_str in existing:
+            return None
+    else:
+        checked = _link_exists_cache.setdefault(linked_doctype, {})
+        if value_str not in checked:
+            checked[value_str] = bool(frappe.db.exists(linked_doctype, value_str))
+        if checked[value_str]:
+            return None
 
     # 2️⃣ Case-insensitive cache check (if cache exists)
-    existing = _link_cache.get(linked_doctype)
-    if existing:
-        for v in existing:
-            if str(v).strip().lower() == value_str.lower():
-                return None
+    if existing and value_str.casefold() in _link_cache_cf[linked_doctype]:
+        return None
 
     # 3️⃣ Suggestions (optional)
     suggestions = get_link_suggestions(linked_doctype, value_str)
 
-    return {
-        "row": row_idx,
-        "column": label,
-        "code": "LINK_NOT_FOUND",
-        "message": f"{label}: '{original_value}' not found in {linked_doctype}",
-        "suggestions": suggestions
-    }
+    return CellError(
+        row_idx, label, "LINK_NOT_FOUND", f"{label}: '{original_value}' not found in {linked_doctype}", suggestions
+    )